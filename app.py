@@ -11,28 +11,98 @@ import threading
 import queue
 import time
 import traceback
+import atexit
+import gzip
+import shutil
+import logging
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
 from pathlib import Path
-import asyncio
 from scraper import FacebookCommentScraper
+from browser_manager import BrowserManager
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['OUTPUT_FOLDER'] = 'output'
+app.config['GZIP_CACHE_FOLDER'] = 'download_cache'  # Compressed copies of output CSVs (safe to delete)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
 
 # Global state
 scraper_thread = None
 scraper_running = False
-log_queue = queue.Queue()
 current_scraper = None
 
+# CSV downloads smaller than this are sent uncompressed
+GZIP_MIN_SIZE = 1024
+# Fastest deflate level - the user waits for it, and CSV text still shrinks several-fold
+GZIP_LEVEL = 1
+
+# Most URLs scraped at once on one Facebook session (the UI offers 1 to this)
+MAX_CONCURRENCY = 3
+
+# SSE: lines sent per frame at most, and idle seconds before a heartbeat
+SSE_MAX_BATCH = 200
+SSE_HEARTBEAT_SECONDS = 15
+
+# One Chromium reused by every scrape job (launched on first use)
+# Set FB_SCRAPER_CDP_ENDPOINT (e.g. http://localhost:9222) to attach to an already running Chromium instead
+browser_manager = BrowserManager(cdp_endpoint=os.environ.get('FB_SCRAPER_CDP_ENDPOINT') or None)
+atexit.register(browser_manager.shutdown)
+
+class SseFanoutHandler(logging.Handler):
+    """Copies each log line to every connected /api/logs client"""
+
+    def __init__(self, history_size=500):
+        super().__init__()
+        self.subscribers = set()
+        self.history = deque(maxlen=history_size)  # Current job's lines, replayed to late subscribers
+        self.subscribers_lock = threading.Lock()
+
+    def emit(self, record):
+        message = self.format(record)
+        with self.subscribers_lock:
+            self.history.append(message)
+            for subscriber in self.subscribers:
+                subscriber.put(message)
+
+    def subscribe(self):
+        subscriber = queue.SimpleQueue()
+        with self.subscribers_lock:
+            for message in self.history:
+                subscriber.put(message)
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.subscribers_lock:
+            self.subscribers.discard(subscriber)
+
+    def reset(self):
+        """Forget the previous job's lines"""
+        with self.subscribers_lock:
+            self.history.clear()
+
+# Logging: log() only enqueues; one listener thread prints and fans lines out to SSE clients
+log_formatter = logging.Formatter('[%(asctime)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+log_fanout = SseFanoutHandler()
+log_fanout.setFormatter(log_formatter)
+console_handler = logging.StreamHandler()
+console_handler.setFormatter(log_formatter)
+
+log_records = queue.SimpleQueue()
+logger = logging.getLogger('fb-scraper')
+logger.setLevel(logging.INFO)
+logger.propagate = False
+logger.addHandler(QueueHandler(log_records))
+
+log_listener = QueueListener(log_records, log_fanout, console_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
+
 def log(message):
-    """Add message to log queue"""
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    log_message = f"[{timestamp}] {message}"
-    log_queue.put(log_message)
-    print(log_message)
+    """Send message to the log listener"""
+    logger.info(message)
 
 def run_scraper(urls, cookies, settings):
     """Run scraper in background thread"""
@@ -42,20 +112,16 @@ def run_scraper(urls, cookies, settings):
         scraper_running = True
         log("🚀 Starting scraper...")
 
-        # Create new event loop for this thread
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
         # Initialize scraper
         current_scraper = FacebookCommentScraper(
             viewport_size=settings.get('viewport', '13_inch'),
-            log_callback=log
+            log_callback=log,
+            max_concurrency=settings['concurrency'],
+            fast_mode=bool(settings.get('fast_mode', False))
         )
 
-        # Run scraper
-        result = loop.run_until_complete(
-            current_scraper.scrape_urls(urls, cookies)
-        )
+        # Run scraper on the shared warm browser
+        result = browser_manager.run_scrape(current_scraper, urls, cookies)
 
         if result['success']:
             log(f"✅ Scraping complete! Extracted {result['total_comments']} comments")
@@ -110,10 +176,14 @@ def start_scrape():
 
     # Get settings
     settings = data.get('settings', {})
+    try:
+        concurrency = int(settings.get('concurrency', 1))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid concurrency setting'}), 400
+    settings['concurrency'] = max(1, min(MAX_CONCURRENCY, concurrency))
 
-    # Clear log queue
-    while not log_queue.empty():
-        log_queue.get()
+    # New job: clients connecting from now on only see its logs
+    log_fanout.reset()
 
     # Start scraper thread
     scraper_thread = threading.Thread(
@@ -154,14 +224,33 @@ def get_status():
 def stream_logs():
     """Stream logs using Server-Sent Events"""
     def generate():
-        while True:
-            try:
-                # Get log message with timeout
-                message = log_queue.get(timeout=1)
-                yield f"data: {message}\n\n"
-            except queue.Empty:
-                # Send heartbeat to keep connection alive
-                yield f": heartbeat\n\n"
+        # Subscribed only once the response is iterated, so the finally below always runs for it
+        subscriber = None
+        try:
+            subscriber = log_fanout.subscribe()
+            while True:
+                try:
+                    # Wait for the next log message
+                    batch = [subscriber.get(timeout=SSE_HEARTBEAT_SECONDS)]
+                except queue.Empty:
+                    # Send heartbeat to keep connection alive (only when idle)
+                    yield ": heartbeat\n\n"
+                    continue
+
+                # Coalesce a burst into one frame
+                while len(batch) < SSE_MAX_BATCH:
+                    try:
+                        batch.append(subscriber.get_nowait())
+                    except queue.Empty:
+                        break
+
+                # One "data:" field per line - multi-line messages (tracebacks) stay inside the frame
+                lines = "\n".join(batch).splitlines()
+                yield "".join(f"data: {line}\n" for line in lines) + "\n"
+        finally:
+            # Client disconnected
+            if subscriber is not None:
+                log_fanout.unsubscribe(subscriber)
 
     return Response(generate(), mimetype='text/event-stream')
 
@@ -187,28 +276,63 @@ def upload_cookies():
 @app.route('/api/outputs')
 def list_outputs():
     """List available output files"""
-    output_dir = Path(app.config['OUTPUT_FOLDER'])
+    output_dir = app.config['OUTPUT_FOLDER']
     files = []
 
-    if output_dir.exists():
-        for file in sorted(output_dir.glob('*.csv'), key=lambda x: x.stat().st_mtime, reverse=True):
+    if os.path.isdir(output_dir):
+        # One stat per file: DirEntry caches it
+        with os.scandir(output_dir) as it:
+            entries = [(entry.name, entry.stat()) for entry in it if entry.name.endswith('.csv') and entry.is_file()]
+
+        for name, stat in sorted(entries, key=lambda entry: entry[1].st_mtime, reverse=True):
             files.append({
-                'name': file.name,
-                'size': file.stat().st_size,
-                'modified': datetime.fromtimestamp(file.stat().st_mtime).strftime('%Y-%m-%d %H:%M:%S')
+                'name': name,
+                'size': stat.st_size,
+                'modified': datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S')
             })
 
     return jsonify(files)
 
+def prune_gzip_cache(cache_dir, output_dir):
+    """Delete compressed copies whose CSV no longer exists"""
+    for gz_path in cache_dir.glob('*.csv.gz'):
+        if not (output_dir / gz_path.stem).exists():
+            gz_path.unlink(missing_ok=True)
+
 @app.route('/api/download/<filename>')
 def download_file(filename):
     """Download output file"""
     file_path = Path(app.config['OUTPUT_FOLDER']) / secure_filename(filename)
 
-    if not file_path.exists():
+    # Only the scraper's CSVs are downloadable
+    if file_path.suffix != '.csv' or not file_path.is_file():
         return jsonify({'error': 'File not found'}), 404
 
-    return send_file(file_path, as_attachment=True)
+    stat = file_path.stat()
+    # Quality counts: 'gzip;q=0' refuses gzip ('in' alone ignores the q value)
+    if request.accept_encodings['gzip'] > 0 and stat.st_size > GZIP_MIN_SIZE:
+        # Compressed copy is built once per CSV version and reused by later downloads
+        cache_dir = Path(app.config['GZIP_CACHE_FOLDER'])
+        gz_path = cache_dir / (file_path.name + '.gz')
+        if not gz_path.exists() or gz_path.stat().st_mtime < stat.st_mtime:
+            cache_dir.mkdir(exist_ok=True)
+            prune_gzip_cache(cache_dir, file_path.parent)
+            tmp_path = gz_path.with_name(f"{gz_path.name}.{threading.get_ident()}.tmp")
+            with open(file_path, 'rb') as src, gzip.open(tmp_path, 'wb', compresslevel=GZIP_LEVEL) as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp_path, gz_path)
+
+        response = send_file(gz_path, as_attachment=True, download_name=file_path.name,
+                             mimetype='text/csv', conditional=True)
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+    # conditional=True: ETag/Last-Modified revalidation and Range requests for resumed downloads
+    response = send_file(file_path, as_attachment=True, conditional=True)
+    # Same URL as the gzip variant - caches must key on Accept-Encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
 
 if __name__ == '__main__':
     # Ensure directories exist
@@ -223,16 +347,16 @@ if __name__ == '__main__':
     except Exception as e:
         print(f"Warning: Could not run auto-setup: {e}")
 
-    # Try ports 5001-5010 to avoid conflicts (macOS AirPlay uses 5000)
+    # Prefer port 5001 (macOS AirPlay uses 5000), otherwise let the OS pick a free one
     import socket
 
-    def find_available_port(start_port=5001, max_port=5010):
-        """Find an available port"""
-        for port in range(start_port, max_port + 1):
+    def find_available_port(preferred_port=5001):
+        """Return the preferred port if it is free, else an OS-assigned free port"""
+        for port in (preferred_port, 0):
             try:
                 with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
                     s.bind(('localhost', port))
-                    return port
+                    return s.getsockname()[1]
             except OSError:
                 continue
         return None
@@ -241,10 +365,10 @@ if __name__ == '__main__':
 
     if port is None:
         print("=" * 80)
-        print("❌ ERROR: No available ports found (5001-5010)")
+        print("❌ ERROR: Could not find an available port")
         print("=" * 80)
         print("")
-        print("Please close other applications using these ports.")
+        print("Please check that this machine allows opening local ports.")
         print("")
         exit(1)
 
@@ -258,4 +382,6 @@ if __name__ == '__main__':
     print("=" * 80)
     print("")
 
-    app.run(debug=True, host='0.0.0.0', port=port, threaded=True)
+    # Debugger and auto-reloader only on request (FB_SCRAPER_DEBUG=1) - the reloader forks and polls every source file
+    debug = os.environ.get('FB_SCRAPER_DEBUG') == '1'
+    app.run(debug=debug, host='0.0.0.0', port=port, threaded=True, use_reloader=debug)
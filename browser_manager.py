@@ -0,0 +1,85 @@
+"""
+Warm Chromium shared by scrape jobs of the web interface
+Launched lazily on the first job, then reused (one fresh context per job)
+With a CDP endpoint, an already running Chromium is attached instead of launching one
+"""
+
+import asyncio
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from playwright.async_api import async_playwright, Browser
+
+from scraper import FacebookCommentScraper, BROWSER_ARGS
+
+# Relaunch Chromium after this many jobs to shed its memory growth
+MAX_USES_PER_BROWSER = 50
+
+
+class BrowserManager:
+    """Keeps one Chromium on a background event loop and runs scrape jobs against it"""
+
+    def __init__(self, max_uses: int = MAX_USES_PER_BROWSER, cdp_endpoint: Optional[str] = None):
+        self.max_uses = max(1, max_uses)
+        self.cdp_endpoint = cdp_endpoint  # e.g. "http://localhost:9222" (Chromium started with --remote-debugging-port)
+        self._playwright = None
+        self._browser: Optional[Browser] = None
+        self._uses = 0
+
+        # Playwright objects belong to the loop that created them, so every job runs on this one
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    async def _get_browser(self) -> Tuple[Browser, bool]:
+        """Return the browser and whether it is warm, (re)launching it when missing, crashed or used up"""
+        # A remote browser is not ours to recycle - only reconnect when the connection dropped
+        used_up = self._uses >= self.max_uses and not self.cdp_endpoint
+        if self._browser is not None and (used_up or not self._browser.is_connected()):
+            await self._close_browser()
+
+        if self._browser is None:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            if self.cdp_endpoint:
+                self._browser = await self._playwright.chromium.connect_over_cdp(self.cdp_endpoint)
+            else:
+                self._browser = await self._playwright.chromium.launch(headless=True, args=BROWSER_ARGS)
+            self._uses = 0
+
+        # Warm once a job ran on it; a remote browser was already running before we connected
+        warm = self._uses > 0 or bool(self.cdp_endpoint)
+        self._uses += 1
+        return self._browser, warm
+
+    async def _close_browser(self):
+        # For a CDP connection this only disconnects; the remote Chromium keeps running
+        try:
+            await self._browser.close()
+        except Exception:
+            pass
+        self._browser = None
+
+    async def _scrape(self, scraper: FacebookCommentScraper, urls: List[str], cookies: List[Dict]) -> Dict:
+        browser, warm = await self._get_browser()
+        return await scraper.scrape_urls(urls, cookies, browser=browser, warm=warm)
+
+    def run_scrape(self, scraper: FacebookCommentScraper, urls: List[str], cookies: List[Dict]) -> Dict:
+        """Run scraper.scrape_urls on the shared browser, blocking the calling thread until it finishes"""
+        future = asyncio.run_coroutine_threadsafe(self._scrape(scraper, urls, cookies), self._loop)
+        return future.result()
+
+    async def _shutdown(self):
+        if self._browser is not None:
+            await self._close_browser()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def shutdown(self, timeout: float = 10.0):
+        """Close Chromium and stop the background loop"""
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
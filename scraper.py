@@ -5,21 +5,376 @@ Includes multi-cycle scraping, button clicking, and smart scrolling
 """
 
 import asyncio
+import contextvars
 import csv
+import functools
+import hashlib
+import inspect
+import os
 import re
 import random
 import traceback
+import types
 from pathlib import Path
 from datetime import datetime
-from playwright.async_api import async_playwright, Page, Browser
+from playwright.async_api import async_playwright, Page, Browser, Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
 from typing import List, Dict, Set, Callable, Optional
 
+# URL fragments used by determine_url_type, one case-insensitive alternation per type
+_RE_WATCH_URL = re.compile('|'.join(map(re.escape, ('/watch/', 'watch?v=', '/video/', '/videos/', '/live/', '/media/'))), re.IGNORECASE)
+_RE_REEL_URL = re.compile('|'.join(map(re.escape, ('/reel/', '/reels/'))), re.IGNORECASE)
+
+# Commenter name in a comment/reply aria-label (English and Thai), one scan for all four markers
+# The named group that matched tells which marker was found
+_RE_ARIA = re.compile('|'.join((
+    r'Reply by (?P<reply>.+?) to',
+    r'Comment by (?P<comment>.+?)(?:\s+(?:about\s+)?(?:a\s+(?:few\s+)?)?(?:an\s+)?(?:\d+\s+)?(?:second|minute|hour|day|week|month|year)s?\s+ago|,|$)',
+    r'ความคิดเห็นโดย\s+(?P<th_by>.+?)(?:\s+เมื่อ|,|$)',
+    r'ความคิดเห็นจาก\s+(?P<th_from>.+?)\s+เมื่อ',
+)))
+# (marker, name terminator) used when a marker is present but its pattern did not match
+_ARIA_FALLBACKS = (('Reply by ', ' to '), ('Comment by', ','), ('ความคิดเห็นโดย', 'เมื่อ'), ('ความคิดเห็นจาก', 'เมื่อ'))
+# Exact UI labels (lowercased) that are never comment text
+_UI_LABELS = frozenset({'like', 'reply', 'share', 'follow', 'author'})
+# Relative-timestamp units ("3d", "12w") - digits are checked with str.isdecimal()
+_TIMESTAMP_UNITS = frozenset('wdhmyWDHMY')
+# Thread controls that prefix longer UI text
+_RE_UI_TEXT = re.compile(r'^(?:Most relevant|View \d+ repl)', re.IGNORECASE)
+
+# REEL comment-button candidates as one selector list (':visible' is a Playwright pseudo-class)
+_REEL_COMMENT_BUTTON_SELECTOR = ', '.join(f'{selector}:visible' for selector in (
+    "div[aria-label*='Comment'][role='button']",
+    "div[aria-label*='comment'][role='button']",
+    "svg[aria-label*='Comment']",
+))
+
+# Comment article selectors for WATCH and REEL pages (POST builds its own once per URL from the dialog)
+_WATCH_ARTICLE_SELECTOR = '[role="main"] [role="article"]'
+_REEL_ARTICLE_SELECTOR = 'div[role="complementary"] div[role="article"]'
+
+# First elements that show a page is ready to scrape (waited for after navigation instead of a fixed sleep)
+_POST_READY_SELECTOR = '[role="dialog"] [data-ad-preview="message"], [role="main"] [role="article"]'
+_READY_TIMEOUT = 15000  # ms
+
+CSV_FIELDS = ['URL', 'Type', 'Caption', 'Commenter', 'Comment']
+
+# CRITICAL: Comprehensive browser args for cross-platform stability
+# Includes fixes for Linux, Docker, containers, and resource-constrained environments
+BROWSER_ARGS = [
+    '--no-sandbox',                          # Essential for containers/Docker
+    '--disable-setuid-sandbox',              # Essential for containers/Docker
+    '--disable-dev-shm-usage',               # CRITICAL for limited /dev/shm (Linux/Docker)
+    '--disable-gpu',                         # Prevent GPU crashes
+    '--disable-software-rasterizer',         # Prevent software rendering issues
+    '--disable-extensions',                  # Reduce overhead
+    '--disable-blink-features=AutomationControlled',  # Reduce detection
+    '--no-first-run',                        # Skip first-run setup
+    '--no-default-browser-check',            # Skip browser check
+    '--disable-background-networking',       # Reduce resource usage
+    '--disable-background-timer-throttling', # Prevent timeouts
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+    # Chromium only honours the last --disable-features, so all features go in this one
+    '--disable-features=TranslateUI,IsolateOrigins,site-per-process',  # No translate popups, no renderer per cross-site iframe
+    '--blink-settings=imagesEnabled=false',  # Never load images (keeps the HTTP cache, unlike request routing)
+    '--disable-ipc-flooding-protection',     # Prevent IPC issues
+    '--disable-hang-monitor',                # Prevent hang detection
+    '--autoplay-policy=user-gesture-required',  # Don't autoplay WATCH/REEL videos
+]
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Pause (seconds) between page.close() and a slot's next new_page() - prevents "target closed" (FINAL_FIX_README Fix #2)
+# Not shortened by fast mode: it is browser cleanup time, not a human-like wait
+_URL_DELAY = 3.0
+# Run-wide pause (seconds) after Facebook's rate-limit notice - every slot waits before opening its next URL
+_BLOCKED_URL_DELAY = (30.0, 60.0)
+_STOP_CHECK_INTERVAL = 0.5  # Long waits are slept in steps of this so Stop takes effect quickly
+
+# Fast mode shortens every human-like wait to this fraction (page-load waits included)
+FAST_MODE_DELAY_SCALE = 0.25
+
+# Visibility check and article count of the REEL comments panel in one call
+_COUNT_REEL_COMMENTS_JS = """
+    () => {
+        const container = document.querySelector('div[role="complementary"]');
+        if (!container) return 0;
+
+        const rect = container.getBoundingClientRect();
+        if (!rect.width || !rect.height || getComputedStyle(container).visibility === 'hidden') return 0;
+
+        return container.querySelectorAll('div[role="article"]').length;
+    }
+"""
+
+# One walk over a WATCH/REEL panel's buttons: clicks the first visible "View more comments"
+# and every not-yet-clicked reply expander
+# skipReplyLabels: WATCH never treats a label mentioning replies as "View more comments" (REEL never did that check)
+_EXPAND_THREADS_JS = """
+    (rootSelector, skipReplyLabels) => {
+        const root = document.querySelector(rootSelector);
+        if (!root) return {viewMore: null, expanded: 0};
+
+        const replyCountRe = /\\d+\\s*repl/i;
+        const numberOnlyRe = /^\\d+$/;
+        const buttons = root.querySelectorAll('[role="button"]');
+        let viewMore = null;
+        let expandedCount = 0;
+
+        for (const button of buttons) {
+            const text = (button.innerText || '').toLowerCase();
+
+            if (viewMore === null &&
+                text.includes('view') &&
+                text.includes('more') &&
+                text.includes('comment') &&
+                !(skipReplyLabels && text.includes('repl'))) {
+
+                if (button.offsetParent !== null) {
+                    button.click();
+                    viewMore = button.innerText;
+                    continue;
+                }
+            }
+
+            // Skip buttons already clicked with the same label (label changes when more replies load)
+            if (button.dataset.fbScraperClicked === text) continue;
+
+            if ((text.includes('view') && text.includes('repl')) ||
+                text.includes('replied') ||
+                replyCountRe.test(text)) {
+
+                if (button.querySelector('img') && numberOnlyRe.test(text)) continue;
+
+                if (button.offsetParent !== null) {
+                    button.click();
+                    button.dataset.fbScraperClicked = text;
+                    expandedCount++;
+                }
+            }
+        }
+
+        return {viewMore: viewMore, expanded: expandedCount};
+    }
+"""
+
+# POST variant: clicks every "View more/previous comments" style button and every reply expander in one walk
+_EXPAND_POST_THREADS_JS = """
+    (dialogSelector) => {
+        const dialog = document.querySelector(dialogSelector);
+        if (!dialog) return {clicked: 0, expanded: 0};
+
+        // Words may appear in any order: view+comment, see+more+comment, load/show+more
+        const viewMoreRe = /^(?=.*view)(?=.*comment)|^(?=.*see)(?=.*more)(?=.*comment)|^(?=.*(?:load|show))(?=.*more)/s;
+        const digitRe = /\\d/;
+        const buttons = dialog.querySelectorAll('[role="button"]');
+        let clicked = 0;
+        let expanded = 0;
+
+        for (const button of buttons) {
+            const text = button.innerText || '';
+            const textLower = text.toLowerCase();
+
+            if (viewMoreRe.test(textLower) ||
+                (text.length < 30 && textLower.includes('more') && digitRe.test(text))) {
+
+                if (text.length >= 3 && !button.querySelector('img')) {
+                    try {
+                        button.click();
+                        clicked++;
+                    } catch (e) {
+                        // Ignore
+                    }
+                    continue;
+                }
+            }
+
+            // Skip buttons already clicked with the same label (label changes when more replies load)
+            if (button.dataset.fbScraperClicked === textLower) continue;
+
+            if ((textLower.includes('replied') && textLower.includes('repl')) ||
+                (textLower.includes('view') && textLower.includes('repl'))) {
+                try {
+                    button.click();
+                    button.dataset.fbScraperClicked = textLower;
+                    expanded++;
+                } catch (e) {
+                    // Ignore click errors
+                }
+            }
+        }
+
+        return {clicked: clicked, expanded: expanded};
+    }
+"""
+
+# Facebook's rate-limit notice ("You're Temporarily Blocked" / "You can't use this feature right now")
+# Only dialogs are read (textContent, no layout) instead of the whole page body
+_DETECT_BLOCK_JS = """
+    () => {
+        for (const dialog of document.querySelectorAll('[role="dialog"], [role="alertdialog"]')) {
+            const text = (dialog.textContent || '').toLowerCase();
+            if (text.includes('temporarily blocked') || /can[\u2019']t use this feature/.test(text)) return true;
+        }
+        return false;
+    }
+"""
+# Where Facebook redirects when the cookies no longer hold a session
+_LOGIN_URL_PARTS = ('/login', '/checkpoint/')
+
+# Scroll container of the POST dialog/main role (null until comments render)
+_FIND_POST_SCROLLABLE_JS = """
+    (dialogSelector) => {
+        const dialog = document.querySelector(dialogSelector);
+        if (!dialog) return null;
+
+        const styled = dialog.querySelector('[style*="overflow"]');
+        if (styled) return styled;
+
+        for (const el of dialog.querySelectorAll('*')) {
+            const style = window.getComputedStyle(el);
+            if ((style.overflowY === 'auto' || style.overflowY === 'scroll') &&
+                el.scrollHeight > el.clientHeight) {
+                return el;
+            }
+        }
+        return null;
+    }
+"""
+
+# Scrolls the container found by _FIND_POST_SCROLLABLE_JS so the last loaded comment moves up the view
+_SCROLL_POST_JS = """
+    (scrollable, dialogSelector) => {
+        const dialog = document.querySelector(dialogSelector);
+        if (!dialog) return {scrolled: false};
+        if (!scrollable.isConnected) return {scrolled: false, stale: true, reason: 'Scroll container was replaced'};
+
+        const oldScrollTop = scrollable.scrollTop;
+        const scrollHeight = scrollable.scrollHeight;
+        const clientHeight = scrollable.clientHeight;
+        const maxScroll = scrollHeight - clientHeight;
+
+        const lastComment = Array.from(dialog.querySelectorAll('[role="article"]')).pop();
+        if (lastComment) {
+            const rect = lastComment.getBoundingClientRect();
+            const containerRect = scrollable.getBoundingClientRect();
+            const relativeTop = rect.top - containerRect.top + scrollable.scrollTop;
+
+            const targetScroll = Math.min(relativeTop + clientHeight * 0.8, maxScroll);
+            scrollable.scrollTop = targetScroll;
+        } else {
+            const remainingScroll = maxScroll - oldScrollTop;
+            const scrollAmount = Math.max(clientHeight, remainingScroll * 0.8);
+            scrollable.scrollTop = oldScrollTop + scrollAmount;
+        }
+
+        const newScrollTop = scrollable.scrollTop;
+        const didScroll = newScrollTop > oldScrollTop || oldScrollTop >= maxScroll - 10;
+
+        return {scrolled: didScroll, from: oldScrollTop, to: newScrollTop};
+    }
+"""
+
+# WATCH caption: first text span under the main role long enough to be a caption, skipping section labels
+_WATCH_CAPTION_JS = """
+    () => {
+        const main = document.querySelector('[role="main"]');
+        if (!main) return '';
+
+        const spans = main.querySelectorAll('span.x193iq5w, span.x1lliihq');
+        for (const span of spans) {
+            const text = span.innerText || '';
+            if (text.length > 10 &&
+                !text.includes('Comments') &&
+                !text.includes('Explore more') &&
+                !text.includes('Latest videos')) {
+                return text;
+            }
+        }
+
+        return '';
+    }
+"""
+# WATCH is ready once a comment or the caption itself rendered (the span classes alone match the page chrome)
+_WATCH_READY_JS = f"""
+    () => document.querySelector('{_WATCH_ARTICLE_SELECTOR}') !== null || ({_WATCH_CAPTION_JS.strip()})() !== ''
+"""
+
+# Reads every matching article in one round trip instead of 4+ calls per article
+# Articles unchanged since an earlier pass on the page are skipped (tagged with their text length when read)
+_EXTRACT_ARTICLES_JS = """
+    (articleSelector) => {
+        const snapshots = [];
+
+        for (const article of document.querySelectorAll(articleSelector)) {
+            // Text length changes when replies load or a truncated comment expands - read it again then
+            const signature = String(article.textContent.length);
+            if (article.dataset.fbScraperSeen === signature) continue;
+            article.dataset.fbScraperSeen = signature;
+
+            const profileLink = article.querySelector('a[href*="/user/"], a[href*="profile.php"], a[role="link"]');
+            snapshots.push({
+                ariaLabel: article.getAttribute('aria-label'),
+                profileName: profileLink ? profileLink.innerText : null,
+                texts: Array.from(article.querySelectorAll('div[dir="auto"]'), div => div.innerText)
+            });
+        }
+
+        return snapshots;
+    }
+"""
+
+# The per-cycle helpers above, installed once per context (add_init_script) as window.__fbScraper
+# so each call only sends a one-line call expression instead of the whole function source
+_PAGE_HELPERS_JS = f"""
+window.__fbScraper = {{
+    countReelComments: {_COUNT_REEL_COMMENTS_JS.strip()},
+    expandThreads: {_EXPAND_THREADS_JS.strip()},
+    expandPostThreads: {_EXPAND_POST_THREADS_JS.strip()},
+    findPostScrollable: {_FIND_POST_SCROLLABLE_JS.strip()},
+    scrollPost: {_SCROLL_POST_JS.strip()},
+    extractArticles: {_EXTRACT_ARTICLES_JS.strip()}
+}};
+"""
+_COUNT_REEL_COMMENTS_CALL = '() => window.__fbScraper.countReelComments()'
+_EXPAND_THREADS_CALL = '([rootSelector, skipReplyLabels]) => window.__fbScraper.expandThreads(rootSelector, skipReplyLabels)'
+_EXPAND_POST_THREADS_CALL = 'dialogSelector => window.__fbScraper.expandPostThreads(dialogSelector)'
+_FIND_POST_SCROLLABLE_CALL = 'dialogSelector => window.__fbScraper.findPostScrollable(dialogSelector)'
+_SCROLL_POST_CALL = '(scrollable, dialogSelector) => window.__fbScraper.scrollPost(scrollable, dialogSelector)'
+_EXTRACT_ARTICLES_CALL = 'articleSelector => window.__fbScraper.extractArticles(articleSelector)'
+
+
+def disable_playwright_stack_capture():
+    """Stop playwright-python from walking the Python stack (inspect.stack()) on every API call"""
+    try:
+        from playwright._impl import _connection
+    except ImportError:
+        return
+    # The stack only labels traces and error call sites - everything else on inspect stays available
+    _connection.inspect = types.SimpleNamespace(**{**vars(inspect), 'stack': lambda context=1: []})
+
+
+# Opt-in (FB_SCRAPER_NO_STACK=1): less CPU per Playwright call, less detail in Playwright error locations
+if os.environ.get('FB_SCRAPER_NO_STACK') == '1':
+    disable_playwright_stack_capture()
+
+
+# Index of the URL the current task is scraping, used to prefix its log lines (0 = none)
+_current_url_index = contextvars.ContextVar('current_url_index', default=0)
+
+
 class FacebookCommentScraper:
-    def __init__(self, viewport_size='13_inch', log_callback: Optional[Callable] = None):
-        self.all_comments: List[Dict] = []
-        self.processed_texts: Set[str] = set()
+    def __init__(self, viewport_size='13_inch', log_callback: Optional[Callable] = None,
+                 max_concurrency: int = 1, fast_mode: bool = False):
+        self.total_comments = 0
+        self.output_file: Optional[str] = None
+        self._csv_file = None
+        self._csv_writer: Optional[csv.DictWriter] = None
+        self.processed_texts: Set[int] = set()  # 64-bit digests of normalized comment text
         self.log_callback = log_callback or print
         self.should_stop = False
+        self.resume_at = 0.0  # Event loop time before which no slot opens a URL (rate-limit backoff)
+        self.max_concurrency = max(1, max_concurrency)  # URLs scraped in parallel
+        self.delay_scale = FAST_MODE_DELAY_SCALE if fast_mode else 1.0
 
         # Viewport settings
         viewports = {
@@ -29,9 +384,10 @@ class FacebookCommentScraper:
         self.VIEWPORT = viewports.get(viewport_size, viewports['13_inch'])
 
     def log(self, message: str):
-        """Log message using callback"""
+        """Log message using callback (prefixed with the URL's index while one is being scraped)"""
         if self.log_callback:
-            self.log_callback(message)
+            url_index = _current_url_index.get()
+            self.log_callback(f"[{url_index}] {message}" if url_index else message)
 
     def stop(self):
         """Signal scraper to stop"""
@@ -40,9 +396,18 @@ class FacebookCommentScraper:
 
     async def random_delay(self, min_sec: float = 0.2, max_sec: float = 0.4):
         """Random delay to mimic human behavior"""
-        delay = random.uniform(min_sec, max_sec)
+        delay = random.uniform(min_sec, max_sec) * self.delay_scale
         await asyncio.sleep(delay)
 
+    async def sleep_until(self, deadline: float):
+        """Sleep until the event loop time reaches deadline, returning early once stop was requested"""
+        loop = asyncio.get_running_loop()
+        while not self.should_stop:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(min(remaining, _STOP_CHECK_INTERVAL))
+
     def sanitize_cookies(self, cookies: List[Dict]) -> List[Dict]:
         """Fix cookie format for Playwright"""
         for cookie in cookies:
@@ -56,14 +421,13 @@ class FacebookCommentScraper:
                     cookie['sameSite'] = 'Lax'
         return cookies
 
-    def determine_url_type(self, url: str) -> str:
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def determine_url_type(url: str) -> str:
         """Determine if URL is WATCH, REEL, or POST"""
-        url_lower = url.lower()
-        watch_patterns = ['/watch/', 'watch?v=', '/video/', '/videos/', '/live/', '/media/']
-        if any(pattern in url_lower for pattern in watch_patterns):
+        if _RE_WATCH_URL.search(url):
             return 'WATCH'
-        reel_patterns = ['/reel/', '/reels/']
-        if any(pattern in url_lower for pattern in reel_patterns):
+        if _RE_REEL_URL.search(url):
             return 'REEL'
         return 'POST'
 
@@ -72,156 +436,177 @@ class FacebookCommentScraper:
         if not aria_label:
             return "Unknown"
 
-        if 'Reply by' in aria_label:
-            match = re.search(r'Reply by (.+?) to', aria_label)
-            if match:
-                return match.group(1).strip()
-            name = aria_label.replace('Reply by ', '').split(' to ')[0].strip()
-        elif 'Comment by' in aria_label:
-            match = re.search(r'Comment by (.+?)(?:\s+(?:about\s+)?(?:a\s+(?:few\s+)?)?(?:an\s+)?(?:\d+\s+)?(?:second|minute|hour|day|week|month|year)s?\s+ago|,|$)', aria_label)
-            if match:
-                return match.group(1).strip()
-            name = aria_label.replace('Comment by', '').split(',')[0].strip()
-        elif 'ความคิดเห็นโดย' in aria_label:
-            match = re.search(r'ความคิดเห็นโดย\s+(.+?)(?:\s+เมื่อ|,|$)', aria_label)
-            if match:
-                return match.group(1).strip()
-            name = aria_label.replace('ความคิดเห็นโดย', '').split('เมื่อ')[0].strip()
-        elif 'ความคิดเห็นจาก' in aria_label:
-            match = re.search(r'ความคิดเห็นจาก\s+(.+?)\s+เมื่อ', aria_label)
-            if match:
-                return match.group(1).strip()
-            name = aria_label.replace('ความคิดเห็นจาก', '').split('เมื่อ')[0].strip()
-        else:
-            return "Unknown"
-        return name
+        match = _RE_ARIA.search(aria_label)
+        if match:
+            return match.group(match.lastgroup).strip()
+
+        # Marker without the expected tail (e.g. a reply label with no " to")
+        for marker, terminator in _ARIA_FALLBACKS:
+            if marker.strip() in aria_label:
+                return aria_label.replace(marker, '').split(terminator)[0].strip()
+        return "Unknown"
+
+    def open_output(self):
+        """Open the timestamped output CSV that comments are streamed into"""
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.output_file = f'output/facebook_comments_{timestamp}.csv'
+        self._csv_file = open(self.output_file, 'w', newline='', encoding='utf-8-sig')
+        self._csv_writer = csv.DictWriter(self._csv_file, fieldnames=CSV_FIELDS)
+        self._csv_writer.writeheader()
+
+    def write_comments(self, rows: List[Dict]):
+        """Append a batch of comment rows to the output CSV"""
+        self._csv_writer.writerows(rows)
+        self.total_comments += len(rows)
+
+    def flush_output(self):
+        """Push buffered rows to disk so finished URLs survive a crash"""
+        if self._csv_file:
+            self._csv_file.flush()
+
+    def close_output(self):
+        """Close the output CSV, removing it if no comments were written"""
+        if self._csv_file:
+            self._csv_file.close()
+            self._csv_file = None
+            self._csv_writer = None
+            if self.total_comments == 0:
+                Path(self.output_file).unlink(missing_ok=True)
+
+    def text_key(self, text: str) -> int:
+        """Whitespace-normalized 64-bit digest of comment text for dedup"""
+        text_normalized = ' '.join(text.split())
+        digest = hashlib.blake2b(text_normalized.encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
 
     def is_meaningful_text(self, text: str) -> bool:
         """Check if text is a valid comment"""
-        if not text or len(text.strip()) < 2:
+        if not text:
+            return False
+        stripped = text.strip()
+        if len(stripped) < 2:
+            return False
+        if stripped.lower() in _UI_LABELS:
+            return False
+        # Reaction counts ("12") and relative timestamps ("3d") without the regex engine
+        if len(stripped) <= 3 and stripped.isdecimal():
+            return False
+        if stripped[-1] in _TIMESTAMP_UNITS and stripped[:-1].isdecimal():
+            return False
+        if _RE_UI_TEXT.match(stripped):
             return False
-        ui_patterns = [
-            r'^(Like|Reply|Share|Follow|Author)$',
-            r'^\d+[wdhmy]$',
-            r'^\d{1,3}$',
-            r'^(Most relevant|View \d+ repl)',
-        ]
-        for pattern in ui_patterns:
-            if re.match(pattern, text.strip(), re.IGNORECASE):
-                return False
         return True
 
-    async def scrape_post_comments(self, page: Page, dialog_selector: str, url: str, caption: str) -> int:
-        """Scrape visible comments from POST dialog"""
-        if self.should_stop:
-            return 0
+    async def extract_articles(self, page: Page, article_selector: str) -> List[Dict]:
+        """Snapshot aria-label, profile link text and text blocks of matching articles not read unchanged before"""
+        return await page.evaluate(_EXTRACT_ARTICLES_CALL, article_selector)
 
-        new_count = 0
-        articles = await page.query_selector_all(f'{dialog_selector} [role="article"]')
-        
-        # self.log(f"  DEBUG: Found {len(articles)} articles in cycle")
+    def process_articles(self, articles: List[Dict], url: str, url_type: str, caption: str,
+                         name_fallback: bool = False) -> int:
+        """Filter article snapshots into new comments, returns number of comments added"""
+        rows = []
 
+        # Snapshots come from _EXTRACT_ARTICLES_JS: ariaLabel/profileName are str or None, texts a list of str
         for article in articles:
             if self.should_stop:
                 break
 
-            try:
-                aria_label = await article.get_attribute('aria-label')
-                name = "Unknown"
-                
-                # 1. Try to extract name from aria-label (Preferred)
-                if aria_label and ('Comment by' in aria_label or 
-                                  'Reply by' in aria_label or 
-                                  'ความคิดเห็นโดย' in aria_label or 
-                                  'ความคิดเห็นจาก' in aria_label):
-                    name = self.extract_name_from_aria(aria_label)
-                
-                # 2. Fallback: If no valid aria-label, try to find name in the first link or strong tag
-                if name == "Unknown":
-                    # Check if it's a valid comment structure (usually has a link to profile)
-                    profile_link = await article.query_selector('a[href*="/user/"], a[href*="profile.php"], a[role="link"]')
-                    if profile_link:
-                        name = await profile_link.inner_text()
-                
+            aria_label = article.get('ariaLabel')
+
+            # 1. Try to extract name from aria-label (Preferred) - "Unknown" if it has no comment marker
+            name = self.extract_name_from_aria(aria_label)
+
+            if name == "Unknown":
+                if not name_fallback:
+                    continue
+
+                # 2. Fallback: use the profile link text (POST only)
+                if article.get('profileName') is not None:
+                    name = article['profileName']
+
                 # If still unknown and no aria-label, it might be a UI element or the post itself
                 if name == "Unknown" and not aria_label:
-                    # self.log(f"  DEBUG: Skipped article - No name found")
                     continue
 
-                text_divs = await article.query_selector_all('div[dir="auto"]')
-                comment_text = ""
-
-                for div in text_divs:
-                    div_text = await div.inner_text()
-                    if div_text and self.is_meaningful_text(div_text):
-                        # Avoid capturing the name as the comment
-                        if div_text.strip() != name:
-                            comment_text = div_text.strip()
-                            break
+            comment_text = ""
 
-                if not comment_text:
-                    # self.log(f"  DEBUG: Skipped article - No meaningful text")
+            for div_text in article.get('texts', []):
+                if not div_text:
                     continue
+                stripped = div_text.strip()
+                # Avoid capturing the name as the comment
+                if stripped != name and self.is_meaningful_text(stripped):
+                    comment_text = stripped
+                    break
 
-                text_normalized = ' '.join(comment_text.split())
-                if text_normalized in self.processed_texts:
-                    continue
+            if not comment_text:
+                continue
 
-                self.processed_texts.add(text_normalized)
+            text_key = self.text_key(comment_text)
+            if text_key in self.processed_texts:
+                continue
 
-                self.all_comments.append({
-                    'URL': url,
-                    'Type': 'POST',
-                    'Caption': caption,
-                    'Commenter': name,
-                    'Comment': comment_text
-                })
+            self.processed_texts.add(text_key)
 
-                new_count += 1
-                self.log(f"  Comment #{len(self.all_comments)}: {name}: {comment_text[:50]}...")
+            rows.append({
+                'URL': url,
+                'Type': url_type,
+                'Caption': caption,
+                'Commenter': name,
+                'Comment': comment_text
+            })
 
-            except Exception as e:
-                # self.log(f"  DEBUG: Error processing article: {e}")
-                continue
+            self.log(f"  Comment #{self.total_comments + len(rows)}: {name}: {comment_text[:50]}...")
+
+        # One write per cycle instead of one per comment
+        if rows:
+            self.write_comments(rows)
 
-        return new_count
+        return len(rows)
 
-    async def expand_replies_post(self, page: Page, dialog_selector: str) -> int:
-        """Expand reply threads in POST dialog"""
+    async def scrape_post_comments(self, page: Page, article_selector: str, url: str, caption: str) -> int:
+        """Scrape visible comments from POST dialog"""
         if self.should_stop:
             return 0
 
-        expanded = await page.evaluate("""
-            (dialogSelector) => {
-                const dialog = document.querySelector(dialogSelector);
-                if (!dialog) return 0;
+        articles = await self.extract_articles(page, article_selector)
+        return self.process_articles(articles, url, 'POST', caption, name_fallback=True)
 
-                const buttons = dialog.querySelectorAll('[role="button"]');
-                let clicked = 0;
+    async def expand_post_threads(self, page: Page, dialog_selector: str, after_scroll: bool = False) -> int:
+        """Click "View more comments" and reply buttons in POST dialog, then wait once"""
+        if self.should_stop:
+            return 0
 
-                for (const button of buttons) {
-                    const text = (button.innerText || '').toLowerCase();
-
-                    if ((text.includes('replied') && text.includes('repl')) ||
-                        (text.includes('view') && text.includes('repl'))) {
-                        try {
-                            button.click();
-                            clicked++;
-                        } catch (e) {
-                            // Ignore click errors
-                        }
-                    }
-                }
-
-                return clicked;
-            }
-        """, dialog_selector)
+        result = await page.evaluate(_EXPAND_POST_THREADS_CALL, dialog_selector)
+        clicked = result.get('clicked', 0)
+        expanded = result.get('expanded', 0)
 
+        if clicked > 0:
+            if after_scroll:
+                self.log(f"  Re-clicked {clicked} buttons after scroll")
+            else:
+                self.log(f"  Clicked {clicked} 'View more comments' buttons")
         if expanded > 0:
             self.log(f"  Expanded {expanded} reply threads")
+
+        # One wait covers both kinds of click - the longer one when comments were requested
+        if clicked > 0:
+            await self.random_delay(2.0, 3.0) if after_scroll else await self.random_delay(2.5, 3.5)
+        elif expanded > 0:
             await self.random_delay(1.5, 2.0)
 
-        return expanded
+        return clicked + expanded
+
+    async def wait_until_ready(self, page: Page, selector: Optional[str] = None, ready_js: Optional[str] = None):
+        """Wait for the first element of selector (or ready_js to return truthy) instead of a fixed sleep; short pause if it never shows"""
+        try:
+            if ready_js:
+                await page.wait_for_function(ready_js, timeout=_READY_TIMEOUT)
+            else:
+                await page.wait_for_selector(selector, timeout=_READY_TIMEOUT)
+        except PlaywrightTimeoutError:
+            self.log(f"  ⚠️ Page content not detected after {_READY_TIMEOUT // 1000}s, continuing")
+            await self.random_delay(2.0, 3.0)
 
     async def scrape_post(self, page: Page, url: str):
         """Scrape POST comments with multi-cycle approach"""
@@ -232,18 +617,12 @@ class FacebookCommentScraper:
             await page.goto(url, timeout=60000)
             self.log(f"  ✓ Navigation completed")
 
-            # DIAGNOSTIC: Wait longer for Facebook to load
-            await self.random_delay(5.0, 7.0)
             self.log(f"  Waiting for page to fully load...")
+            await self.wait_until_ready(page, _POST_READY_SELECTOR)
 
-            # DIAGNOSTIC: Check what page we're actually on
-            page_title = await page.title()
-            page_url = page.url
-            self.log(f"  Page title: {page_title[:100]}")
-            self.log(f"  Current URL: {page_url[:100]}")
-
+            # DIAGNOSTIC: Check what page we're actually on (fetched together with the dialog lookup)
             # Find the correct dialog - MATCH ORIGINAL CODE EXACTLY
-            result = await page.evaluate("""
+            page_title, result = await asyncio.gather(page.title(), page.evaluate("""
                 () => {
                     // 1. Try to find in dialogs (modal mode)
                     const dialogs = document.querySelectorAll('[role="dialog"]');
@@ -289,7 +668,10 @@ class FacebookCommentScraper:
 
                     return { found: false, totalDialogs: dialogs.length };
                 }
-            """)
+            """))
+
+            self.log(f"  Page title: {page_title[:100]}")
+            self.log(f"  Current URL: {page.url[:100]}")
 
             # Log result
             if result.get('found'):
@@ -301,6 +683,7 @@ class FacebookCommentScraper:
 
             dialog_selector = result.get('selector', '[data-fb-scraper="main-dialog"]')
             self.log(f"  ✓ Using selector: {dialog_selector}")
+            article_selector = f'{dialog_selector} [role="article"]'
 
             # Expand caption (Click "See more")
             await page.evaluate("""
@@ -347,166 +730,61 @@ class FacebookCommentScraper:
             """, dialog_selector)
 
             self.log(f"  Caption: {caption[:100]}..." if caption else "  No caption")
+            caption = caption or "No caption"
 
             max_cycles = 20
             no_new_streak = 0
+            url_total = 0
+            scrollable = None  # ElementHandle of the dialog's scroll container
 
             for cycle in range(1, max_cycles + 1):
                 if self.should_stop:
                     break
 
                 self.log(f"  === Cycle {cycle}/{max_cycles} ===")
-                cycle_start = len(self.all_comments)
-
-                # Click "View more comments" buttons
-                clicked = await page.evaluate("""
-                    (dialogSelector) => {
-                        const dialog = document.querySelector(dialogSelector);
-                        if (!dialog) return 0;
-
-                        const buttons = dialog.querySelectorAll('[role="button"]');
-                        let clicked = 0;
-
-                        for (const button of buttons) {
-                            const text = button.innerText || '';
-                            const textLower = text.toLowerCase();
-
-                            if ((textLower.includes('view') && textLower.includes('more') && textLower.includes('comment')) ||
-                                (textLower.includes('view') && textLower.includes('previous') && textLower.includes('comment')) ||
-                                (textLower.includes('view') && textLower.includes('comment')) ||
-                                (textLower.includes('see') && textLower.includes('more') && textLower.includes('comment')) ||
-                                (textLower.includes('load') && textLower.includes('more')) ||
-                                (textLower.includes('show') && textLower.includes('more')) ||
-                                (textLower.includes('more') && /\\d+/.test(text) && text.length < 30)) {
-
-                                if (text.length < 3 || button.querySelector('img')) continue;
-
-                                try {
-                                    button.click();
-                                    clicked++;
-                                } catch (e) {
-                                    // Ignore
-                                }
-                            }
-                        }
-
-                        return clicked;
-                    }
-                """, dialog_selector)
-
-                if clicked > 0:
-                    self.log(f"  Clicked {clicked} 'View more comments' buttons")
-                    await self.random_delay(2.5, 3.5)
+                cycle_new = 0
 
-                # Expand replies
-                await self.expand_replies_post(page, dialog_selector)
+                # Click "View more comments" buttons and expand replies
+                await self.expand_post_threads(page, dialog_selector)
 
                 # Scrape comments
-                await self.scrape_post_comments(page, dialog_selector, url, caption or "No caption")
-
-                # Smart scrolling
-                scrolled = await page.evaluate("""
-                    (dialogSelector) => {
-                        const dialog = document.querySelector(dialogSelector);
-                        if (!dialog) return {scrolled: false};
-
-                        let scrollable = window.__fbScrollElement;
-
-                        if (!scrollable) {
-                            scrollable = dialog.querySelector('[style*="overflow"]');
-
-                            if (!scrollable) {
-                                const allElements = dialog.querySelectorAll('*');
-                                for (const el of allElements) {
-                                    const style = window.getComputedStyle(el);
-                                    if ((style.overflowY === 'auto' || style.overflowY === 'scroll') &&
-                                        el.scrollHeight > el.clientHeight) {
-                                        scrollable = el;
-                                        window.__fbScrollElement = el;
-                                        break;
-                                    }
-                                }
-                            }
-                        }
+                cycle_new += await self.scrape_post_comments(page, article_selector, url, caption)
 
-                        if (!scrollable) return {scrolled: false, reason: 'No scrollable element'};
-
-                        const oldScrollTop = scrollable.scrollTop;
-                        const scrollHeight = scrollable.scrollHeight;
-                        const clientHeight = scrollable.clientHeight;
-                        const maxScroll = scrollHeight - clientHeight;
-
-                        const lastComment = Array.from(dialog.querySelectorAll('[role="article"]')).pop();
-                        if (lastComment) {
-                            const rect = lastComment.getBoundingClientRect();
-                            const containerRect = scrollable.getBoundingClientRect();
-                            const relativeTop = rect.top - containerRect.top + scrollable.scrollTop;
-
-                            const targetScroll = Math.min(relativeTop + clientHeight * 0.8, maxScroll);
-                            scrollable.scrollTop = targetScroll;
-                        } else {
-                            const remainingScroll = maxScroll - oldScrollTop;
-                            const scrollAmount = Math.max(clientHeight, remainingScroll * 0.8);
-                            scrollable.scrollTop = oldScrollTop + scrollAmount;
-                        }
+                # Smart scrolling (scroll container is looked up once, then reused through its handle)
+                if scrollable is None:
+                    handle = await page.evaluate_handle(_FIND_POST_SCROLLABLE_CALL, dialog_selector)
+                    scrollable = handle.as_element()
+                    if scrollable is None:
+                        await handle.dispose()
 
-                        const newScrollTop = scrollable.scrollTop;
-                        const didScroll = newScrollTop > oldScrollTop || oldScrollTop >= maxScroll - 10;
-
-                        return {scrolled: didScroll, from: oldScrollTop, to: newScrollTop};
-                    }
-                """, dialog_selector)
+                if scrollable is None:
+                    scrolled = {'scrolled': False, 'reason': 'No scrollable element'}
+                else:
+                    try:
+                        scrolled = await scrollable.evaluate(_SCROLL_POST_CALL, dialog_selector)
+                    except PlaywrightError as e:
+                        # Handle died with its execution context (frame navigated) - treated like a stale one
+                        scrolled = {'scrolled': False, 'stale': True, 'reason': str(e)}
+                    if scrolled.get('stale'):
+                        # Facebook re-rendered the dialog - look the container up again next cycle
+                        try:
+                            await scrollable.dispose()
+                        except PlaywrightError:
+                            pass
+                        scrollable = None
 
                 if scrolled.get('scrolled'):
                     self.log(f"  Scrolled: {scrolled['from']} → {scrolled['to']}")
                     await self.random_delay(2.0, 3.0)
 
-                    # Re-click buttons after scrolling
-                    view_more2 = await page.evaluate("""
-                        (dialogSelector) => {
-                            const dialog = document.querySelector(dialogSelector);
-                            if (!dialog) return 0;
-
-                            const buttons = dialog.querySelectorAll('[role="button"]');
-                            let clicked = 0;
-
-                            for (const button of buttons) {
-                                const text = button.innerText || '';
-                                const textLower = text.toLowerCase();
-
-                                if ((textLower.includes('view') && textLower.includes('more') && textLower.includes('comment')) ||
-                                    (textLower.includes('view') && textLower.includes('previous') && textLower.includes('comment')) ||
-                                    (textLower.includes('view') && textLower.includes('comment')) ||
-                                    (textLower.includes('see') && textLower.includes('more') && textLower.includes('comment')) ||
-                                    (textLower.includes('load') && textLower.includes('more')) ||
-                                    (textLower.includes('show') && textLower.includes('more')) ||
-                                    (textLower.includes('more') && /\\d+/.test(text) && text.length < 30)) {
-
-                                    if (text.length < 3 || button.querySelector('img')) continue;
-
-                                    try {
-                                        button.click();
-                                        clicked++;
-                                    } catch (e) {}
-                                }
-                            }
-
-                            return clicked;
-                        }
-                    """, dialog_selector)
-
-                    if view_more2 > 0:
-                        self.log(f"  Re-clicked {view_more2} buttons after scroll")
-                        await self.random_delay(2.0, 3.0)
-
-                    # Re-expand replies
-                    await self.expand_replies_post(page, dialog_selector)
+                    # Re-click buttons and re-expand replies after scrolling
+                    await self.expand_post_threads(page, dialog_selector, after_scroll=True)
 
                     # Re-scrape comments
-                    await self.scrape_post_comments(page, dialog_selector, url, caption or "No caption")
+                    cycle_new += await self.scrape_post_comments(page, article_selector, url, caption)
 
-                cycle_new = len(self.all_comments) - cycle_start
-                self.log(f"  Cycle {cycle}: Found {cycle_new} new (Total: {len(self.all_comments)})")
+                url_total += cycle_new
+                self.log(f"  Cycle {cycle}: Found {cycle_new} new (Total: {url_total})")
 
                 if cycle_new == 0:
                     no_new_streak += 1
@@ -516,87 +794,30 @@ class FacebookCommentScraper:
                 else:
                     no_new_streak = 0
 
-            self.log(f"  ✅ POST complete: {len(self.all_comments)} total comments")
+            self.log(f"  ✅ POST complete: {url_total} comments")
 
         except Exception as e:
             self.log(f"  ❌ Error scraping POST: {str(e)}")
             raise
 
-    async def click_view_more_watch(self, page: Page) -> bool:
-        """Click 'View more comments' button for WATCH videos"""
-        if self.should_stop:
-            return False
-
-        result = await page.evaluate("""
-            () => {
-                const main = document.querySelector('[role="main"]');
-                if (!main) return {clicked: false};
-
-                const buttons = main.querySelectorAll('[role="button"]');
-
-                for (const button of buttons) {
-                    const text = button.innerText || '';
-                    const textLower = text.toLowerCase();
-
-                    if (textLower.includes('view') &&
-                        textLower.includes('more') &&
-                        textLower.includes('comment') &&
-                        !textLower.includes('repl')) {
-
-                        if (button.offsetParent !== null) {
-                            button.click();
-                            return {clicked: true, text: text};
-                        }
-                    }
-                }
-
-                return {clicked: false};
-            }
-        """)
-
-        if result.get('clicked'):
-            self.log(f"  ✓ Clicked: {result.get('text', 'View more comments')}")
-            await self.random_delay(2.0, 3.0)
-            return True
-
-        return False
-
-    async def expand_replies_watch(self, page: Page) -> int:
-        """Expand reply threads in WATCH videos"""
+    async def expand_threads(self, page: Page, root_selector: str, skip_reply_labels: bool) -> int:
+        """Click 'View more comments' and expand reply threads in a WATCH/REEL panel, then wait once"""
         if self.should_stop:
             return 0
 
-        result = await page.evaluate("""
-            () => {
-                const main = document.querySelector('[role="main"]');
-                if (!main) return {expanded: 0};
-
-                const buttons = main.querySelectorAll('[role="button"]');
-                let expandedCount = 0;
-
-                for (const button of buttons) {
-                    const text = (button.innerText || '').toLowerCase();
-
-                    if ((text.includes('view') && text.includes('repl')) ||
-                        text.includes('replied') ||
-                        text.match(/\\d+\\s*repl/i)) {
-
-                        if (button.querySelector('img') && text.match(/^\\d+$/)) continue;
-
-                        if (button.offsetParent !== null) {
-                            button.click();
-                            expandedCount++;
-                        }
-                    }
-                }
-
-                return {expanded: expandedCount};
-            }
-        """)
-
+        result = await page.evaluate(_EXPAND_THREADS_CALL, [root_selector, skip_reply_labels])
+        view_more = result.get('viewMore')
         count = result.get('expanded', 0)
+
+        if view_more is not None:
+            self.log(f"  ✓ Clicked: {view_more or 'View more comments'}")
         if count > 0:
             self.log(f"  Expanded {count} reply threads")
+
+        # One wait covers both kinds of click - the longer one when comments were requested
+        if view_more is not None:
+            await self.random_delay(2.0, 3.0)
+        elif count > 0:
             await self.random_delay(1.0, 2.0)
 
         return count
@@ -608,98 +829,34 @@ class FacebookCommentScraper:
         try:
             # FIXED: Remove wait_until to match working core logic
             await page.goto(url, timeout=60000)
-            await self.random_delay(3.0, 5.0)
+            await self.wait_until_ready(page, ready_js=_WATCH_READY_JS)
 
-            # Extract caption
-            caption = await page.evaluate("""
-                () => {
-                    const main = document.querySelector('[role="main"]');
-                    if (!main) return '';
-
-                    const spans = main.querySelectorAll('span.x193iq5w, span.x1lliihq');
-                    for (const span of spans) {
-                        const text = span.innerText || '';
-                        if (text.length > 10 &&
-                            !text.includes('Comments') &&
-                            !text.includes('Explore more') &&
-                            !text.includes('Latest videos')) {
-                            return text;
-                        }
-                    }
+            async def initial_scroll():
+                await page.evaluate("window.scrollBy(0, 500)")
+                await self.random_delay(2.0, 3.0)
 
-                    return '';
-                }
-            """)
+            # Extract caption while the initial scroll settles
+            caption, _ = await asyncio.gather(page.evaluate(_WATCH_CAPTION_JS), initial_scroll())
 
             self.log(f"  Caption: {caption[:100]}..." if caption else "  No caption")
-
-            # Initial scroll
-            await page.evaluate("window.scrollBy(0, 500)")
-            await self.random_delay(2.0, 3.0)
+            caption = caption or "No caption"
 
             max_cycles = 30
             no_new_streak = 0
+            url_total = 0
 
             for cycle in range(1, max_cycles + 1):
                 if self.should_stop:
                     break
 
                 self.log(f"  === Cycle {cycle}/{max_cycles} ===")
-                cycle_start = len(self.all_comments)
-
-                await self.click_view_more_watch(page)
-                await self.expand_replies_watch(page)
-
-                articles = await page.query_selector_all('[role="main"] [role="article"]')
-
-                for article in articles:
-                    if self.should_stop:
-                        break
-
-                    try:
-                        aria_label = await article.get_attribute('aria-label')
-
-                        if not aria_label or ('Comment by' not in aria_label and
-                                              'Reply by' not in aria_label and
-                                              'ความคิดเห็นโดย' not in aria_label and
-                                              'ความคิดเห็นจาก' not in aria_label):
-                            continue
-
-                        name = self.extract_name_from_aria(aria_label)
-                        text_divs = await article.query_selector_all('div[dir="auto"]')
-                        comment_text = ""
+                await self.expand_threads(page, '[role="main"]', skip_reply_labels=True)
 
-                        for div in text_divs:
-                            div_text = await div.inner_text()
-                            if div_text and self.is_meaningful_text(div_text):
-                                if div_text.strip() != name:
-                                    comment_text = div_text.strip()
-                                    break
+                articles = await self.extract_articles(page, _WATCH_ARTICLE_SELECTOR)
+                cycle_new = self.process_articles(articles, url, 'WATCH', caption)
 
-                        if not comment_text:
-                            continue
-
-                        text_normalized = ' '.join(comment_text.split())
-                        if text_normalized in self.processed_texts:
-                            continue
-
-                        self.processed_texts.add(text_normalized)
-
-                        self.all_comments.append({
-                            'URL': url,
-                            'Type': 'WATCH',
-                            'Caption': caption or "No caption",
-                            'Commenter': name,
-                            'Comment': comment_text
-                        })
-
-                        self.log(f"  Comment #{len(self.all_comments)}: {name}: {comment_text[:50]}...")
-
-                    except Exception as e:
-                        continue
-
-                cycle_new = len(self.all_comments) - cycle_start
-                self.log(f"  Cycle {cycle}: Found {cycle_new} new (Total: {len(self.all_comments)})")
+                url_total += cycle_new
+                self.log(f"  Cycle {cycle}: Found {cycle_new} new (Total: {url_total})")
 
                 if cycle_new == 0:
                     no_new_streak += 1
@@ -709,7 +866,7 @@ class FacebookCommentScraper:
                 else:
                     no_new_streak = 0
 
-            self.log(f"  ✅ WATCH complete: {len(self.all_comments)} total comments")
+            self.log(f"  ✅ WATCH complete: {url_total} comments")
 
         except Exception as e:
             self.log(f"  ❌ Error scraping WATCH: {str(e)}")
@@ -721,40 +878,25 @@ class FacebookCommentScraper:
             return False
 
         for attempt in range(3):
-            container = await page.query_selector('div[role="complementary"]')
-            if container:
-                try:
-                    is_visible = await container.is_visible()
-                    if is_visible:
-                        comments = await page.query_selector_all("div[role='complementary'] div[role='article']")
-                        if len(comments) > 0:
-                            self.log(f"  Comments auto-loaded with {len(comments)} comments")
-                            return True
-                except:
-                    pass
+            try:
+                comment_count = await page.evaluate(_COUNT_REEL_COMMENTS_CALL)
+                if comment_count > 0:
+                    self.log(f"  Comments auto-loaded with {comment_count} comments")
+                    return True
+            except:
+                pass
 
             if attempt < 2:
                 await self.random_delay(0.5, 0.8)
 
-        # Try to click comment button
-        button_selectors = [
-            "div[aria-label*='Comment'][role='button']",
-            "div[aria-label*='comment'][role='button']",
-            "svg[aria-label*='Comment']",
-            "div[role='button'] svg[aria-label*='Comment']"
-        ]
-
+        # Try to click comment button (first visible candidate, one query)
         button = None
-        for selector in button_selectors:
-            try:
-                button = await page.query_selector(selector)
-                if button:
-                    is_visible = await button.is_visible()
-                    if is_visible:
-                        self.log(f"  Found comment button")
-                        break
-            except:
-                continue
+        try:
+            button = await page.query_selector(_REEL_COMMENT_BUTTON_SELECTOR)
+            if button:
+                self.log(f"  Found comment button")
+        except:
+            pass
 
         if button:
             try:
@@ -769,84 +911,6 @@ class FacebookCommentScraper:
 
         return False
 
-    async def click_view_more_reel(self, page: Page) -> bool:
-        """Click 'View more comments' button for REEL"""
-        if self.should_stop:
-            return False
-
-        result = await page.evaluate("""
-            () => {
-                const comp = document.querySelector('[role="complementary"]');
-                if (!comp) return {clicked: false};
-
-                const buttons = comp.querySelectorAll('[role="button"]');
-
-                for (const button of buttons) {
-                    const text = button.innerText || '';
-                    const textLower = text.toLowerCase();
-
-                    if (textLower.includes('view') &&
-                        textLower.includes('more') &&
-                        textLower.includes('comment')) {
-
-                        if (button.offsetParent !== null) {
-                            button.click();
-                            return {clicked: true, text: text};
-                        }
-                    }
-                }
-
-                return {clicked: false};
-            }
-        """)
-
-        if result.get('clicked'):
-            self.log(f"  ✓ Clicked: {result.get('text', 'View more comments')}")
-            await self.random_delay(2.0, 3.0)
-            return True
-
-        return False
-
-    async def expand_replies_reel(self, page: Page) -> int:
-        """Expand reply threads in REEL"""
-        if self.should_stop:
-            return 0
-
-        result = await page.evaluate("""
-            () => {
-                const comp = document.querySelector('[role="complementary"]');
-                if (!comp) return {expanded: 0};
-
-                const buttons = comp.querySelectorAll('[role="button"]');
-                let expandedCount = 0;
-
-                for (const button of buttons) {
-                    const text = (button.innerText || '').toLowerCase();
-
-                    if ((text.includes('view') && text.includes('repl')) ||
-                        text.includes('replied') ||
-                        text.match(/\\d+\\s*repl/i)) {
-
-                        if (button.querySelector('img') && text.match(/^\\d+$/)) continue;
-
-                        if (button.offsetParent !== null) {
-                            button.click();
-                            expandedCount++;
-                        }
-                    }
-                }
-
-                return {expanded: expandedCount};
-            }
-        """)
-
-        count = result.get('expanded', 0)
-        if count > 0:
-            self.log(f"  Expanded {count} reply threads")
-            await self.random_delay(1.0, 2.0)
-
-        return count
-
     async def scrape_reel(self, page: Page, url: str):
         """Scrape REEL comments"""
         self.log(f"Scraping REEL: {url}")
@@ -910,70 +974,24 @@ class FacebookCommentScraper:
             """)
 
             self.log(f"  Caption: {caption[:100]}..." if caption else "  No caption")
+            caption = caption or "No caption"
 
             max_cycles = 50
             no_new_streak = 0
+            url_total = 0
 
             for cycle in range(1, max_cycles + 1):
                 if self.should_stop:
                     break
 
                 self.log(f"  === Cycle {cycle}/{max_cycles} ===")
-                cycle_start = len(self.all_comments)
-
-                await self.click_view_more_reel(page)
-                await self.expand_replies_reel(page)
-
-                articles = await page.query_selector_all('div[role="complementary"] div[role="article"]')
-
-                for article in articles:
-                    if self.should_stop:
-                        break
-
-                    try:
-                        aria_label = await article.get_attribute('aria-label')
-
-                        if not aria_label or ('Comment by' not in aria_label and
-                                              'Reply by' not in aria_label and
-                                              'ความคิดเห็นโดย' not in aria_label and
-                                              'ความคิดเห็นจาก' not in aria_label):
-                            continue
+                await self.expand_threads(page, '[role="complementary"]', skip_reply_labels=False)
 
-                        name = self.extract_name_from_aria(aria_label)
-                        text_divs = await article.query_selector_all('div[dir="auto"]')
-                        comment_text = ""
+                articles = await self.extract_articles(page, _REEL_ARTICLE_SELECTOR)
+                cycle_new = self.process_articles(articles, url, 'REEL', caption)
 
-                        for div in text_divs:
-                            div_text = await div.inner_text()
-                            if div_text and self.is_meaningful_text(div_text):
-                                if div_text.strip() != name:
-                                    comment_text = div_text.strip()
-                                    break
-
-                        if not comment_text:
-                            continue
-
-                        text_normalized = ' '.join(comment_text.split())
-                        if text_normalized in self.processed_texts:
-                            continue
-
-                        self.processed_texts.add(text_normalized)
-
-                        self.all_comments.append({
-                            'URL': url,
-                            'Type': 'REEL',
-                            'Caption': caption or "No caption",
-                            'Commenter': name,
-                            'Comment': comment_text
-                        })
-
-                        self.log(f"  Comment #{len(self.all_comments)}: {name}: {comment_text[:50]}...")
-
-                    except Exception as e:
-                        continue
-
-                cycle_new = len(self.all_comments) - cycle_start
-                self.log(f"  Cycle {cycle}: Found {cycle_new} new (Total: {len(self.all_comments)})")
+                url_total += cycle_new
+                self.log(f"  Cycle {cycle}: Found {cycle_new} new (Total: {url_total})")
 
                 if cycle_new == 0:
                     no_new_streak += 1
@@ -983,19 +1001,25 @@ class FacebookCommentScraper:
                 else:
                     no_new_streak = 0
 
-            self.log(f"  ✅ REEL complete: {len(self.all_comments)} total comments")
+            self.log(f"  ✅ REEL complete: {url_total} comments")
 
         except Exception as e:
             self.log(f"  ❌ Error scraping REEL: {str(e)}")
             raise
 
-    async def scrape_url(self, context, url: str, url_index: int, total_urls: int):
-        """Scrape a single URL using shared context with fresh page (from working core logic)"""
+    async def scrape_url(self, context, url: str, url_index: int, total_urls: int) -> str:
+        """Scrape a single URL using shared context with fresh page (from working core logic)
+
+        Returns 'OK', 'ERROR' or 'BLOCKED' (Facebook showed its rate-limit notice)
+        """
         if self.should_stop:
-            return
+            return 'OK'
 
         self.log(f"[{url_index}/{total_urls}] {url}")
 
+        # Lines of parallel URLs interleave - tag everything logged for this one (each gather task has its own context)
+        url_index_token = _current_url_index.set(url_index)
+
         url_type = self.determine_url_type(url)
         self.log(f"  Type: {url_type}")
 
@@ -1014,9 +1038,20 @@ class FacebookCommentScraper:
 
             self.log(f"  ✓ Successfully scraped {url_type}")
 
+            if any(part in page.url for part in _LOGIN_URL_PARTS):
+                self.log("  ⚠️ Redirected to login - cookies may be expired")
+                status = 'ERROR'
+            elif await page.evaluate(_DETECT_BLOCK_JS):
+                status = 'BLOCKED'
+            else:
+                status = 'OK'
+
         except Exception as e:
             self.log(f"  ❌ Error scraping {url_type}: {str(e)}")
+            status = 'ERROR'
         finally:
+            self.flush_output()
+
             # CRITICAL: Always close page after scraping
             try:
                 await page.close()
@@ -1024,98 +1059,116 @@ class FacebookCommentScraper:
             except Exception as close_error:
                 self.log(f"  ⚠️  Page close warning: {str(close_error)}")
 
-    async def scrape_urls(self, urls: List[str], cookies: List[Dict]) -> Dict:
-        """Main scraping function"""
+        _current_url_index.reset(url_index_token)
+        return status
+
+    async def scrape_in_context(self, context, urls: List[str], cookies: List[Dict], warm: bool = False):
+        """Install cookies and request blocking on a context, then scrape all URLs in it"""
+        # Install the uploaded cookies for every page of this context
+        await context.add_cookies(cookies)
+        self.log(f"✓ Created browser context with {len(cookies)} cookies")
+
+        # No context.route here: any route disables the HTTP cache, so every URL would re-download Facebook's
+        # JS/CSS bundles and every request would detour through Python. Images are off via BROWSER_ARGS instead
+
+        # Comment helpers are defined on every page before Facebook's own scripts run
+        await context.add_init_script(_PAGE_HELPERS_JS)
+
+        # A warm shared browser (already connected, earlier jobs ran on it) skips the cold-start checks
+        if not warm:
+            # STABILITY: Let context fully initialize
+            await asyncio.sleep(1.0)
+
+            # HEALTH CHECK: Verify browser is working before scraping
+            try:
+                self.log("Running browser health check...")
+                test_page = await context.new_page()
+                await test_page.goto('about:blank', timeout=10000)
+                await test_page.close()
+                self.log("✓ Browser health check passed")
+            except Exception as health_error:
+                self.log(f"❌ Browser health check FAILED: {health_error}")
+                self.log("⚠️  Browser may be unstable. Try: 1) Reinstall Playwright browsers, 2) Check system resources")
+                raise Exception(f"Browser initialization failed: {health_error}")
+
+        # Process URLs with shared context, up to max_concurrency pages at once
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        loop = asyncio.get_running_loop()
+
+        async def scrape_with_limit(idx: int, url: str):
+            async with semaphore:
+                # A block seen by any slot holds back every slot on this account
+                await self.sleep_until(self.resume_at)
+                if self.should_stop:
+                    return
+
+                status = await self.scrape_url(context, url, idx, len(urls))
+
+                if status == 'BLOCKED':
+                    self.log("🛑 Facebook is rate limiting this account")
+                    if idx < len(urls):
+                        self.log("⏳ Backing off before next URL...")
+                        backoff_end = loop.time() + random.uniform(*_BLOCKED_URL_DELAY)
+                        self.resume_at = max(self.resume_at, backoff_end)
+
+                # CRITICAL: Delay before this slot takes the next URL (from original working code)
+                # Gives browser/context time to clean up after closing page
+                if idx < len(urls):
+                    self.log("⏳ Waiting before next URL...")
+                    await self.sleep_until(loop.time() + _URL_DELAY)
+
+        await asyncio.gather(*(scrape_with_limit(idx, url) for idx, url in enumerate(urls, 1)))
+
+        if self.should_stop:
+            self.log("⏹️ Stopped by user")
+
+    async def scrape_urls(self, urls: List[str], cookies: List[Dict], browser: Optional[Browser] = None,
+                          warm: bool = False) -> Dict:
+        """Main scraping function (pass an already running browser to skip the Chromium launch, warm=True if it already served a job)"""
         try:
-            self.all_comments = []
+            self.total_comments = 0
             self.processed_texts = set()
             self.should_stop = False
+            self.resume_at = 0.0
 
             cookies_sanitized = self.sanitize_cookies(cookies)
 
-            async with async_playwright() as playwright:
-                # CRITICAL: Comprehensive browser args for cross-platform stability
-                # Includes fixes for Linux, Docker, containers, and resource-constrained environments
-                browser = await playwright.chromium.launch(
-                    headless=True,
-                    args=[
-                        '--no-sandbox',                          # Essential for containers/Docker
-                        '--disable-setuid-sandbox',              # Essential for containers/Docker
-                        '--disable-dev-shm-usage',               # CRITICAL for limited /dev/shm (Linux/Docker)
-                        '--disable-gpu',                         # Prevent GPU crashes
-                        '--disable-software-rasterizer',         # Prevent software rendering issues
-                        '--disable-extensions',                  # Reduce overhead
-                        '--disable-blink-features=AutomationControlled',  # Reduce detection
-                        '--no-first-run',                        # Skip first-run setup
-                        '--no-default-browser-check',            # Skip browser check
-                        '--disable-background-networking',       # Reduce resource usage
-                        '--disable-background-timer-throttling', # Prevent timeouts
-                        '--disable-backgrounding-occluded-windows',
-                        '--disable-renderer-backgrounding',
-                        '--disable-features=TranslateUI',        # Disable translate popups
-                        '--disable-ipc-flooding-protection',     # Prevent IPC issues
-                        '--disable-hang-monitor',                # Prevent hang detection
-                    ]
-                )
-
-                # CRITICAL FIX: Create ONE context for all URLs (from working core logic)
-                # This prevents "target closed" errors from repeatedly creating/destroying contexts
-                context = await browser.new_context(
-                    viewport=self.VIEWPORT,
-                    user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                )
-                await context.add_cookies(cookies_sanitized)
-                self.log(f"✓ Created browser context with {len(cookies_sanitized)} cookies")
-
-                # STABILITY: Let context fully initialize
-                await asyncio.sleep(1.0)
-
-                # HEALTH CHECK: Verify browser is working before scraping
-                try:
-                    self.log("Running browser health check...")
-                    test_page = await context.new_page()
-                    await test_page.goto('about:blank', timeout=10000)
-                    await test_page.close()
-                    self.log("✓ Browser health check passed")
-                except Exception as health_error:
-                    self.log(f"❌ Browser health check FAILED: {health_error}")
-                    self.log("⚠️  Browser may be unstable. Try: 1) Reinstall Playwright browsers, 2) Check system resources")
-                    raise Exception(f"Browser initialization failed: {health_error}")
-
-                # Process URLs with shared context
-                for idx, url in enumerate(urls, 1):
-                    if self.should_stop:
-                        self.log("⏹️ Stopped by user")
-                        break
-
-                    await self.scrape_url(context, url, idx, len(urls))
+            # Comments are written as they are found instead of buffered until the end
+            self.open_output()
 
-                    # CRITICAL: Delay between URLs (from original working code)
-                    # Gives browser/context time to clean up after closing page
-                    if idx < len(urls):
-                        self.log("⏳ Waiting 3 seconds before next URL...")
-                        await asyncio.sleep(3.0)
-
-                # Close browser gracefully
+            if browser is not None:
+                # Warm browser owned by the caller (see browser_manager.py) - only this job's context is closed
+                context = await browser.new_context(viewport=self.VIEWPORT, user_agent=USER_AGENT)
                 try:
-                    await browser.close()
-                except Exception as close_error:
-                    self.log(f"⚠️  Browser close warning: {str(close_error)}")
+                    await self.scrape_in_context(context, urls, cookies_sanitized, warm=warm)
+                finally:
+                    try:
+                        await context.close()
+                    except Exception as close_error:
+                        self.log(f"⚠️  Context close warning: {str(close_error)}")
+            else:
+                async with async_playwright() as playwright:
+                    # CRITICAL FIX: Create ONE context for all URLs (from working core logic)
+                    # This prevents "target closed" errors from repeatedly creating/destroying contexts
+                    browser = await playwright.chromium.launch(headless=True, args=BROWSER_ARGS)
+                    context = await browser.new_context(viewport=self.VIEWPORT, user_agent=USER_AGENT)
 
-            # Save results
-            if self.all_comments:
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                output_file = f'output/facebook_comments_{timestamp}.csv'
+                    try:
+                        await self.scrape_in_context(context, urls, cookies_sanitized)
+                    finally:
+                        # Close browser gracefully
+                        try:
+                            await browser.close()
+                        except Exception as close_error:
+                            self.log(f"⚠️  Browser close warning: {str(close_error)}")
 
-                with open(output_file, 'w', newline='', encoding='utf-8-sig') as f:
-                    writer = csv.DictWriter(f, fieldnames=['URL', 'Type', 'Caption', 'Commenter', 'Comment'])
-                    writer.writeheader()
-                    writer.writerows(self.all_comments)
+            self.close_output()
 
+            if self.total_comments:
                 return {
                     'success': True,
-                    'output_file': output_file,
-                    'total_comments': len(self.all_comments)
+                    'output_file': self.output_file,
+                    'total_comments': self.total_comments
                 }
             else:
                 return {
@@ -1126,31 +1179,18 @@ class FacebookCommentScraper:
         except Exception as e:
             self.log(f"⚠️  Error occurred: {str(e)}")
 
-            # Save what we collected, even if there was an error
-            if self.all_comments:
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                output_file = f'output/facebook_comments_{timestamp}.csv'
+            # Keep what we collected, even if there was an error
+            self.close_output()
 
-                try:
-                    with open(output_file, 'w', newline='', encoding='utf-8-sig') as f:
-                        writer = csv.DictWriter(f, fieldnames=['URL', 'Type', 'Caption', 'Commenter', 'Comment'])
-                        writer.writeheader()
-                        writer.writerows(self.all_comments)
-
-                    self.log(f"✅ Saved {len(self.all_comments)} comments despite error")
-
-                    return {
-                        'success': True,
-                        'output_file': output_file,
-                        'total_comments': len(self.all_comments),
-                        'warning': str(e)
-                    }
-                except Exception as save_error:
-                    self.log(f"❌ Could not save CSV: {str(save_error)}")
-                    return {
-                        'success': False,
-                        'error': f"Scraping error: {str(e)}, Save error: {str(save_error)}"
-                    }
+            if self.total_comments:
+                self.log(f"✅ Saved {self.total_comments} comments despite error")
+
+                return {
+                    'success': True,
+                    'output_file': self.output_file,
+                    'total_comments': self.total_comments,
+                    'warning': str(e)
+                }
             else:
                 error_msg = f"{str(e)}\n{traceback.format_exc()}"
                 self.log(f"❌ Error details: {error_msg}")
@@ -93,6 +93,8 @@ async function startScraping() {
 
     // Get settings
     const viewport = document.getElementById('viewport').value;
+    const concurrency = parseInt(document.getElementById('concurrency').value, 10);
+    const fastMode = document.getElementById('fastMode').checked;
 
     // Disable start button, enable stop button
     document.getElementById('startBtn').disabled = true;
@@ -104,9 +106,6 @@ async function startScraping() {
     // Clear log
     document.getElementById('logOutput').innerHTML = '';
 
-    // Start log stream
-    startLogStream();
-
     // Start scraping
     try {
         const response = await fetch('/api/scrape', {
@@ -118,14 +117,20 @@ async function startScraping() {
                 urls: urlText,
                 cookies: cookies,
                 settings: {
-                    viewport: viewport
+                    viewport: viewport,
+                    concurrency: concurrency,
+                    fast_mode: fastMode
                 }
             })
         });
 
         const data = await response.json();
 
-        if (!data.success) {
+        if (data.success) {
+            // Subscribe only once the server reset its log history for this job
+            // (lines logged before the stream connects are replayed to it)
+            startLogStream();
+        } else {
             alert('Error: ' + data.error);
             updateStatus('error', 'Error');
             document.getElementById('startBtn').disabled = false;
@@ -165,8 +170,11 @@ function startLogStream() {
     eventSource = new EventSource('/api/logs');
 
     eventSource.onmessage = function(event) {
-        if (event.data && !event.data.startsWith(':')) {
-            addLog(event.data);
+        // The server coalesces bursts: one event may carry several lines
+        if (event.data) {
+            for (const line of event.data.split('\n')) {
+                addLog(line);
+            }
         }
     };
 